@@ -1,18 +1,73 @@
 import streamlit as st
 import os
+import random
 import re
 import tempfile
+import subprocess
 import base64
-from gtts import gTTS
+import hashlib
+from gtts import gTTS, gTTSError
 from pydub import AudioSegment
-from pydub.generators import Sine
 import io
+import numpy as np
+import asyncio
+import concurrent.futures
+import threading
+import aiohttp
 
 st.set_page_config(page_title="Podcast Generator", page_icon="🎙️")
 
 st.title("Podcast Transcript to Audio Converter")
 st.markdown("Upload your podcast transcript and convert it to a multi-voice audio file.")
 
+# Synthesized speech is cached on disk so reruns skip the round-trip to Google TTS;
+# about one write in TTS_CACHE_PRUNE_EVERY trims the cache back to TTS_CACHE_MAX_FILES
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".podcast_tts_cache")
+TTS_CACHE_MAX_FILES = 2048
+TTS_CACHE_PRUNE_EVERY = 64
+
+# Every segment is converted to gTTS's native format before joining, so speech is never resampled
+OUTPUT_FRAME_RATE = 24000
+OUTPUT_SAMPLE_WIDTH = 2
+OUTPUT_CHANNELS = 1
+
+# A transcript is split on sound cues in square brackets and on "Speaker:" at the start of a line;
+# a lone "[" ends the current turn like a cue does
+TRANSCRIPT_TOKEN_RE = re.compile(r'(?P<cue>\[[^\]\n]*\])|(?P<bracket>\[)|^[ \t]*(?P<speaker>[A-Za-z]+):\s*', re.MULTILINE)
+
+# Sound cues are recognised with one match: music fading in or out, or a line for everyone.
+# Cue text is lowercased before matching; "in" and "out" must be whole words so that
+# "intro" or "into" don't count
+CUE_DISPATCH_RE = re.compile(
+    r'(?P<music_in>music.*fade.*\bin\b|fade.*\bin\b.*music)'
+    r'|(?P<music_out>music.*fade.*\bout\b|fade.*\bout\b.*music)'
+    r'|(?P<all>^all:\s*(?P<all_text>.*))'
+)
+
+# Each progress update is a message to the browser, so long scripts only send this many per stage
+PROGRESS_UPDATES = 20
+
+# Simplified approach: Just use different language variants for different voices
+# These are all guaranteed to work with Google TTS
+VOICE_OPTIONS = (
+    {'lang': 'en-us', 'tld': 'com'},     # US English
+    {'lang': 'en-gb', 'tld': 'co.uk'},   # UK English
+    {'lang': 'en-au', 'tld': 'com.au'},  # Australian English
+    {'lang': 'en-ca', 'tld': 'ca'},      # Canadian English
+)
+
+# gTTS requests are sent concurrently over one long-lived session, sharing this many
+# connections, which are kept open between runs for up to a minute
+TTS_MAX_CONNECTIONS = 16
+TTS_KEEPALIVE_SECONDS = 60
+
+# Layer III bitrates in kbps by header index, used to find MP3 frame lengths
+MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+# Audio in a Google TTS response, copied from the pattern in gTTS 2.x's gTTS.stream()
+GTTS_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
 def transcript_to_podcast(transcript_text):
     """
     Convert a podcast transcript with multiple speakers into an audio file with different voices.
@@ -23,147 +78,140 @@ def transcript_to_podcast(transcript_text):
     Returns:
     bytes: The final audio file as bytes
     """
-    # Parse the transcript to identify speakers and their lines
-    pattern = r'([A-Za-z]+):\s*((?:.+?)(?=\n[A-Za-z]+:|$|\[))'
-    speaker_turns = re.findall(pattern, transcript_text, re.DOTALL)
-    
-    # Also find music/sound cues in square brackets
-    sound_cues = re.findall(r'\[(.*?)\]', transcript_text)
+    # Parse the transcript into speaker turns and sound cues, in script order
+    all_elements = parse_transcript(transcript_text)
+    speaker_turns = [element for element in all_elements if isinstance(element, tuple)]
+    sound_cues = [element for element in all_elements if not isinstance(element, tuple)]
     
-    # Extract unique speakers
-    speakers = list(set([turn[0].strip() for turn in speaker_turns]))
+    # Extract unique speakers in order of appearance
+    speakers = list(dict.fromkeys(turn[0] for turn in speaker_turns))
     st.write(f"Found {len(speakers)} speakers: {', '.join(speakers)}")
     st.write(f"Found {len(sound_cues)} sound cues")
     
-    # Simplified approach: Just use different language variants for different voices
-    # These are all guaranteed to work with Google TTS
-    voice_options = [
-        {'lang': 'en-us', 'tld': 'com'},     # US English
-        {'lang': 'en-gb', 'tld': 'co.uk'},   # UK English
-        {'lang': 'en-au', 'tld': 'com.au'},  # Australian English
-        {'lang': 'en-ca', 'tld': 'ca'}       # Canadian English
-    ]
-    
     # Assign voices to speakers based on order
-    speaker_voices = {}
-    for i, speaker in enumerate(speakers):
-        speaker_voices[speaker] = voice_options[i % len(voice_options)]
+    speaker_voices = {speaker: VOICE_OPTIONS[i % len(VOICE_OPTIONS)] for i, speaker in enumerate(speakers)}
     
-    # Create temporary directory for audio segments
-    temp_dir = tempfile.mkdtemp()
-    segments = []
+    # Speech and music are placed on separate timelines as (sample offset, samples) and
+    # only mixed once at the end, so nothing is concatenated along the way
+    speech_events = []
+    music_events = []
+    position = 0
     
     # Create intro music
-    intro_music = generate_music(5000, "intro")  # 5 seconds of intro music
-    intro_music = intro_music.fade_in(1000).fade_out(2000)
-    segments.append(intro_music)
+    intro_music = generate_music(5000, "intro", fade_in_ms=1000, fade_out_ms=2000)  # 5 seconds of intro music
+    music_events.append((position, intro_music))
+    position += len(intro_music)
     
-    # Process each dialogue turn and sound cue in order by rebuilding the script
-    all_elements = []
+    # Create progress bar
+    progress_bar = st.progress(0)
+    status_text = st.empty()
     
-    # Extract positions of sound cues
-    cue_positions = [(m.start(), m.group()) for m in re.finditer(r'\[(.*?)\]', transcript_text)]
+    # Collect every line that needs speech before processing anything, so the
+    # network-bound gTTS requests can run in parallel
+    tts_tasks = {}
+    cue_kinds = {}
+    for i, element in enumerate(all_elements):
+        if isinstance(element, tuple):  # Speaker turn
+            speaker, text = element
+            tts_tasks[i] = (text, speaker_voices[speaker])
+        else:  # Sound cue, matched once here and handled by kind below
+            cue = CUE_DISPATCH_RE.search(element.strip('[]').lower())
+            cue_kinds[i] = cue.lastgroup if cue else None
+            if cue_kinds[i] == 'all':
+                # Use just one voice for simplicity
+                tts_tasks[i] = (cue.group('all_text').strip(), VOICE_OPTIONS[0])
     
-    # Extract positions of speaker turns
-    turn_positions = []
-    for match in re.finditer(r'([A-Za-z]+):\s*', transcript_text):
-        speaker = match.group(1)
-        start_pos = match.end()
+    # Key for each element that needs speech; the same key may appear more than once
+    tts_keys = {i: (text, voice['lang'], voice['tld']) for i, (text, voice) in tts_tasks.items()}
+    
+    # Decoded samples for each distinct key, or the error that stopped it
+    speech = {}
+    if tts_keys:
+        status_text.text("Converting dialogue...")
         
-        # Find the end of this turn
-        end_pos = len(transcript_text)
+        def show_tts_progress(done, total):
+            # Speech synthesis takes the first half of the progress bar
+            progress_bar.progress(int((done / total) * 50))
+            status_text.text(f"Converted {done} of {total} lines of dialogue...")
         
-        # Look for the next speaker or sound cue
-        next_turn = re.search(r'\n[A-Za-z]+:', transcript_text[start_pos:])
-        if next_turn:
-            candidate_end = start_pos + next_turn.start()
-            if candidate_end < end_pos:
-                end_pos = candidate_end
-                
-        next_cue = re.search(r'\[', transcript_text[start_pos:])
-        if next_cue:
-            candidate_end = start_pos + next_cue.start()
-            if candidate_end < end_pos:
-                end_pos = candidate_end
+        tts_cache = synthesize_all(
+            tts_keys.values(),
+            on_progress=show_tts_progress,
+        )
         
-        text = transcript_text[start_pos:end_pos].strip()
-        if text:  # Only add if there's actual text
-            turn_positions.append((match.start(), (speaker, text)))
-    
-    # Combine and sort all elements by position
-    all_elements = cue_positions + turn_positions
-    all_elements.sort(key=lambda x: x[0])
+        fetched = []
+        for key, future in tts_cache.items():
+            if future.exception() is None:
+                fetched.append(key)
+            else:
+                speech[key] = future.exception()
+        
+        # Decoding every clip in one ffmpeg process avoids starting one per line
+        if fetched:
+            status_text.text("Decoding dialogue...")
+            decoded = decode_mp3_clips([tts_cache[key].result() for key in fetched])
+            speech.update(zip(fetched, decoded))
     
-    # Create progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    def speech_for(i):
+        """Return the samples for an element, raising the error if it could not be converted"""
+        samples = speech[tts_keys[i]]
+        if isinstance(samples, Exception):
+            raise samples
+        return samples
     
     # Process each element in order
-    for i, (_, element) in enumerate(all_elements):
+    update_every = max(1, -(-len(all_elements) // PROGRESS_UPDATES))
+    for i, element in enumerate(all_elements):
         # Update progress
-        progress = int((i / len(all_elements)) * 100)
-        progress_bar.progress(progress)
+        update_status = i % update_every == 0
+        if update_status:
+            progress = 50 + int((i / len(all_elements)) * 50)
+            progress_bar.progress(progress)
         
         if isinstance(element, tuple):  # Speaker turn
             speaker, text = element
             
-            status_text.text(f"Converting {speaker}'s dialogue...")
-            
-            # Create TTS audio
-            segment_file = os.path.join(temp_dir, f"segment_{len(segments)}.mp3")
+            if update_status:
+                status_text.text(f"Adding {speaker}'s dialogue...")
             
             try:
-                # Get the voice for this speaker
-                voice = speaker_voices[speaker]
-                
-                # Generate the TTS audio
-                tts = gTTS(text=text, lang=voice['lang'], tld=voice['tld'], slow=False)
-                tts.save(segment_file)
+                voice = speech_for(i)
+                speech_events.append((position, voice))
                 
                 # Add a short pause after each speaker (300ms)
-                speaker_audio = AudioSegment.from_file(segment_file)
-                pause = AudioSegment.silent(duration=300)
-                segments.append(speaker_audio)
-                segments.append(pause)
+                position += len(voice) + ms_to_samples(300)
             except Exception as e:
                 st.warning(f"Skipped text: '{text}' due to error: {str(e)}")
                 # Add a silence instead to maintain timing
-                segments.append(AudioSegment.silent(duration=1000))
+                position += ms_to_samples(1000)
             
         else:  # Sound cue
             cue_text = element.strip('[]').lower()
-            status_text.text(f"Processing sound cue: {cue_text}")
+            if update_status:
+                status_text.text(f"Processing sound cue: {cue_text}")
             
-            if "music" in cue_text and "fade" in cue_text:
-                if "in" in cue_text:
-                    music = generate_music(3000, "background").fade_in(1500)
-                    segments.append(music)
-                elif "out" in cue_text:
-                    music = generate_music(3000, "outro").fade_out(2000)
-                    segments.append(music)
-            elif "all:" in cue_text.lower():
+            if cue_kinds[i] == 'music_in':
+                music = generate_music(3000, "background", fade_in_ms=1500)
+                music_events.append((position, music))
+                position += len(music)
+            elif cue_kinds[i] == 'music_out':
+                music = generate_music(3000, "outro", fade_out_ms=2000)
+                music_events.append((position, music))
+                position += len(music)
+            elif cue_kinds[i] == 'all':
                 try:
                     # Create "See you next time" with mixed voices
-                    text = cue_text.split(":", 1)[1].strip()
-                    
-                    # Use just one voice for simplicity
-                    all_segment_file = os.path.join(temp_dir, "all_voices.mp3")
-                    voice = voice_options[0]  # Use first voice
-                    tts = gTTS(text=text, lang=voice['lang'], tld=voice['tld'], slow=False)
-                    tts.save(all_segment_file)
-                    all_voices = AudioSegment.from_file(all_segment_file)
-                    
-                    segments.append(all_voices)
+                    voice = speech_for(i)
+                    speech_events.append((position, voice))
+                    position += len(voice)
                 except Exception as e:
                     st.warning(f"Skipped 'ALL' text due to error: {str(e)}")
-                    segments.append(AudioSegment.silent(duration=1000))
+                    position += ms_to_samples(1000)
     
-    # Combine all segments into final audio
-    if segments:
+    # Mix the timelines into final audio
+    if position:
         status_text.text("Combining audio segments...")
-        final_audio = segments[0]
-        for segment in segments[1:]:
-            final_audio += segment
+        final_audio = mix_timelines(speech_events, music_events, position)
             
         # Export the final podcast to a BytesIO object
         audio_bytes = io.BytesIO()
@@ -178,26 +226,380 @@ def transcript_to_podcast(transcript_text):
         st.error("No audio segments were created.")
         return None
 
-def generate_music(duration_ms, music_type="background"):
-    """Generate simple music tones based on the type needed"""
+def parse_transcript(transcript_text):
+    """
+    Split a transcript into speaker turns and sound cues in a single pass.
+    
+    Parameters:
+    transcript_text (str): The podcast transcript text
+    
+    Returns:
+    list: Sound cues as strings and speaker turns as (speaker, text) tuples, in script order
+    """
+    elements = []
+    speaker = None
+    text_start = 0
+    
+    for match in TRANSCRIPT_TOKEN_RE.finditer(transcript_text):
+        # Every token ends the current speaker's turn
+        if speaker is not None:
+            text = transcript_text[text_start:match.start()].strip()
+            if text:  # Only add if there's actual text
+                elements.append((speaker, text))
+        
+        if match.lastgroup == 'cue':
+            elements.append(match.group())
+        speaker = match.group('speaker')
+        text_start = match.end()
+    
+    if speaker is not None:
+        text = transcript_text[text_start:].strip()
+        if text:
+            elements.append((speaker, text))
+    
+    return elements
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def generate_music(duration_ms, music_type="background", fade_in_ms=0, fade_out_ms=0):
+    """
+    Generate simple music tones based on the type needed.
+    
+    The music only depends on the arguments, so results are cached across reruns. The
+    samples are returned as a read-only array, so the cached copy can be shared.
+    
+    Returns:
+    numpy.ndarray: 16-bit samples at the output frame rate
+    """
     if music_type == "intro":
         # Create a simple jingle for intro
-        tone1 = Sine(440).to_audio_segment(duration=500).apply_gain(-3)  # A4
-        tone2 = Sine(494).to_audio_segment(duration=500).apply_gain(-3)  # B4
-        tone3 = Sine(523).to_audio_segment(duration=500).apply_gain(-3)  # C5
-        jingle = tone1 + tone2 + tone3 + tone3 + tone2 + tone1
-        return jingle * (duration_ms // len(jingle) + 1)
+        tone1 = sine_tone(440, 500, -3)  # A4
+        tone2 = sine_tone(494, 500, -3)  # B4
+        tone3 = sine_tone(523, 500, -3)  # C5
+        jingle = np.concatenate([tone1, tone2, tone3, tone3, tone2, tone1])
+        samples = np.tile(jingle, duration_ms // 3000 + 1)  # The jingle lasts 3 seconds
     elif music_type == "outro":
         # Create a simple outro
-        tone1 = Sine(523).to_audio_segment(duration=500).apply_gain(-3)  # C5
-        tone2 = Sine(494).to_audio_segment(duration=500).apply_gain(-3)  # B4
-        tone3 = Sine(440).to_audio_segment(duration=500).apply_gain(-3)  # A4
-        jingle = tone1 + tone2 + tone3 + tone3 + tone2 + tone1
-        return jingle * (duration_ms // len(jingle) + 1)
+        tone1 = sine_tone(523, 500, -3)  # C5
+        tone2 = sine_tone(494, 500, -3)  # B4
+        tone3 = sine_tone(440, 500, -3)  # A4
+        jingle = np.concatenate([tone1, tone2, tone3, tone3, tone2, tone1])
+        samples = np.tile(jingle, duration_ms // 3000 + 1)  # The jingle lasts 3 seconds
     else:
         # Background music - gentle tone
-        tone = Sine(392).to_audio_segment(duration=duration_ms).apply_gain(-10)  # G4 at lower volume
-        return tone
+        samples = sine_tone(392, duration_ms, -10)  # G4 at lower volume
+    
+    music = pcm_segment(samples)
+    if fade_in_ms:
+        music = music.fade_in(fade_in_ms)
+    if fade_out_ms:
+        music = music.fade_out(fade_out_ms)
+    return np.frombuffer(music.raw_data, dtype=np.int16)
+
+def sine_tone(frequency, duration_ms, gain_db):
+    """Generate a sine wave as 16-bit samples at the output frame rate"""
+    sample_count = OUTPUT_FRAME_RATE * duration_ms // 1000
+    t = np.arange(sample_count, dtype=np.float32) / OUTPUT_FRAME_RATE
+    amplitude = 32767 * 10 ** (gain_db / 20)
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+def ms_to_samples(duration_ms):
+    """Convert a duration to a number of samples at the output frame rate"""
+    return OUTPUT_FRAME_RATE * duration_ms // 1000
+
+def pcm_segment(samples):
+    """Wrap 16-bit samples at the output frame rate in an AudioSegment"""
+    return AudioSegment(
+        samples.tobytes(),
+        frame_rate=OUTPUT_FRAME_RATE,
+        sample_width=OUTPUT_SAMPLE_WIDTH,
+        channels=OUTPUT_CHANNELS,
+    )
+
+def decode_mp3_clips(mp3_clips):
+    """
+    Decode MP3 clips to 16-bit samples at the output frame rate, using one ffmpeg process.
+    
+    If the batch cannot be decoded, each clip is decoded on its own so a single bad
+    clip only loses its own line.
+    
+    Parameters:
+    mp3_clips (list): MP3 data for each clip
+    
+    Returns:
+    list: A NumPy int16 array for each clip, or the error that stopped it
+    """
+    try:
+        return decode_mp3_batch(mp3_clips)
+    except Exception as e:
+        if len(mp3_clips) == 1:
+            return [e]
+    
+    decoded = []
+    for clip in mp3_clips:
+        try:
+            decoded.extend(decode_mp3_batch([clip]))
+        except Exception as e:
+            decoded.append(e)
+    return decoded
+
+def decode_mp3_batch(mp3_clips):
+    """
+    Decode MP3 clips joined end to end with a single ffmpeg call and split the result.
+    
+    MP3 frames can be concatenated directly, and the clip boundaries are found from
+    the number of frames in each clip.
+    """
+    process = subprocess.run(
+        [AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+         "-f", "mp3", "-i", "pipe:0",
+         "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ar", str(OUTPUT_FRAME_RATE), "-ac", str(OUTPUT_CHANNELS), "pipe:1"],
+        input=b"".join(mp3_clips),
+        capture_output=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode the speech: {process.stderr.decode(errors='replace').strip()}")
+    
+    samples = np.frombuffer(process.stdout, dtype=np.int16)
+    lengths = [mp3_sample_count(clip) for clip in mp3_clips]
+    if not sum(lengths):
+        raise RuntimeError("No MP3 frames found in the speech")
+    
+    # The decoder trims encoder padding, so scale the frame counts to the decoded length
+    ends = np.rint(np.cumsum(lengths) * (len(samples) / sum(lengths))).astype(int)
+    return np.split(samples, ends[:-1])
+
+def mp3_sample_count(mp3_data):
+    """Count the samples in MP3 data at the output frame rate by reading its frame headers"""
+    position = 0
+    
+    # Skip an ID3v2 tag, whose size is stored in 7-bit bytes
+    if mp3_data[:3] == b"ID3" and len(mp3_data) >= 10:
+        size = 0
+        for byte in mp3_data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        position = 10 + size + (10 if mp3_data[5] & 0x10 else 0)
+    
+    sample_count = 0
+    while position + 4 <= len(mp3_data):
+        header = mp3_data[position:position + 4]
+        version = (header[1] >> 3) & 0x03
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 0x03
+        
+        # Only MPEG Layer III frame headers are counted; anything else is skipped a byte at a time
+        if (header[0] != 0xFF or header[1] & 0xE0 != 0xE0 or version == 1
+                or (header[1] >> 1) & 0x03 != 1 or bitrate_index in (0, 15) or rate_index == 3):
+            position += 1
+            continue
+        
+        if version == 3:  # MPEG-1
+            bitrate = MPEG1_BITRATES[bitrate_index]
+            frame_rate = (44100, 48000, 32000)[rate_index]
+            frame_samples = 1152
+        else:  # MPEG-2 and 2.5, which gTTS uses at 24 kHz
+            bitrate = MPEG2_BITRATES[bitrate_index]
+            frame_rate = (22050, 24000, 16000)[rate_index] // (2 if version == 0 else 1)
+            frame_samples = 576
+        
+        padding = (header[2] >> 1) & 0x01
+        position += frame_samples // 8 * bitrate * 1000 // frame_rate + padding
+        sample_count += frame_samples * OUTPUT_FRAME_RATE / frame_rate
+    
+    return sample_count
+
+def mix_timelines(speech_events, music_events, sample_count):
+    """
+    Render speech and music placed at sample offsets into one preallocated buffer.
+    
+    Speech never overlaps, so it is copied straight into place. Music is then added
+    on top in a single pass, so it may also overlap speech.
+    
+    Parameters:
+    speech_events (list): (offset, samples) pairs for the dialogue
+    music_events (list): (offset, samples) pairs for the music
+    sample_count (int): Length of the podcast in samples
+    
+    Returns:
+    AudioSegment: The mixed audio
+    """
+    mixed = np.zeros(sample_count, dtype=np.int16)
+    for offset, samples in speech_events:
+        mixed[offset:offset + len(samples)] = samples
+    
+    for offset, samples in music_events:
+        samples = samples[:sample_count - offset]
+        region = mixed[offset:offset + len(samples)]
+        # Clip rather than wrap around where the music and speech add up past the 16-bit range
+        region[:] = np.clip(region.astype(np.int32) + samples, -32768, 32767)
+    
+    return pcm_segment(mixed)
+
+@st.cache_resource
+def get_tts_session():
+    """
+    Start an event loop in a background thread holding one HTTP session for Google TTS.
+    
+    The session lives as long as the server, so its keep-alive connections are reused
+    by every run instead of being opened again for each podcast.
+    
+    Returns:
+    tuple: The event loop and the aiohttp.ClientSession that runs on it
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="tts-session", daemon=True).start()
+    session = asyncio.run_coroutine_threadsafe(open_tts_session(), loop).result()
+    return loop, session
+
+async def open_tts_session():
+    """Create the shared session, which aiohttp requires to happen inside its event loop"""
+    connector = aiohttp.TCPConnector(limit=TTS_MAX_CONNECTIONS, keepalive_timeout=TTS_KEEPALIVE_SECONDS)
+    # Honour HTTP(S)_PROXY like gTTS does, which passes urllib's proxies to requests
+    return aiohttp.ClientSession(connector=connector, trust_env=True)
+
+def synthesize_all(keys, on_progress=None):
+    """
+    Synthesize many lines concurrently on the shared TTS session.
+    
+    Repeated keys share a single request, so each distinct line is only synthesized once.
+    
+    Parameters:
+    keys (iterable): (text, lang, tld) tuples to synthesize
+    on_progress (callable): Called with (done, total) as requests finish, at most
+        PROGRESS_UPDATES times
+    
+    Returns:
+    dict: A finished future for each distinct key, whose result() is the MP3 audio
+        or raises the error that stopped it
+    """
+    loop, session = get_tts_session()
+    futures = {}
+    for key in keys:
+        if key not in futures:
+            futures[key] = asyncio.run_coroutine_threadsafe(synthesize(session, *key), loop)
+    
+    pending = set(futures.values())
+    update_every = max(1, -(-len(futures) // PROGRESS_UPDATES))
+    last_update = 0
+    while pending:
+        _, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        done = len(futures) - len(pending)
+        if on_progress and (done - last_update >= update_every or not pending):
+            on_progress(done, len(futures))
+            last_update = done
+    
+    return futures
+
+async def synthesize(session, text, lang, tld, slow=False):
+    """
+    Convert text to speech with Google TTS, reusing previously synthesized audio when possible.
+    
+    Results are cached on disk under TTS_CACHE_DIR, keyed by a SHA-256 hash of the
+    text and voice settings.
+    
+    Parameters:
+    session (aiohttp.ClientSession): The session used for requests
+    text (str): The text to speak
+    lang (str): The gTTS language code
+    tld (str): The Google domain used to pick the accent
+    slow (bool): Whether to read the text slowly
+    
+    Returns:
+    bytes: The MP3 audio
+    """
+    key = hashlib.sha256(f"{lang}|{tld}|{slow}|{text}".encode()).hexdigest()
+    cache_file = os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+    
+    # The event loop is shared by every session, so disk access runs in worker threads
+    audio_data = await asyncio.to_thread(read_tts_cache, cache_file)
+    if audio_data is not None:
+        return audio_data
+    
+    audio_data = await fetch_tts(session, text, lang, tld, slow)
+    await asyncio.to_thread(write_tts_cache, cache_file, audio_data)
+    return audio_data
+
+def read_tts_cache(cache_file):
+    """Return cached MP3 audio, or None if it is missing or cannot be read"""
+    try:
+        # Touch the file so the least recently used entries are evicted first
+        os.utime(cache_file)
+        with open(cache_file, "rb") as f:
+            return f.read()
+    except OSError:
+        # Not cached yet, removed by a concurrent prune, or unreadable; fetch it again
+        return None
+
+def write_tts_cache(cache_file, audio_data):
+    """Save MP3 audio to the cache; the cache is only a speed-up, so failures are ignored"""
+    temp_path = None
+    try:
+        # Write to a temporary file first so a concurrent reader never sees a partial MP3
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=TTS_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio_data)
+        os.replace(temp_path, cache_file)
+        temp_path = None
+        
+        # Scanning the whole cache is costly, so only some writes check its size
+        if random.random() < 1 / TTS_CACHE_PRUNE_EVERY:
+            prune_tts_cache()
+    except OSError:
+        pass
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+async def fetch_tts(session, text, lang, tld, slow=False):
+    """
+    Download speech for text from Google TTS.
+    
+    gTTS still splits the text and builds the requests, but they are sent with
+    aiohttp instead of the blocking requests session gTTS opens for each one.
+    This mirrors gTTS 2.x internals: gTTS._prepare_requests() and the response
+    parsing in gTTS.stream() (see GTTS_AUDIO_RE), so requirements.txt pins gTTS below 3.
+    
+    Returns:
+    bytes: The MP3 audio
+    """
+    audio_parts = []
+    for request in gTTS(text=text, lang=lang, tld=tld, slow=slow)._prepare_requests():
+        # aiohttp sets the length itself
+        headers = {name: value for name, value in request.headers.items() if name.lower() != "content-length"}
+        async with session.post(request.url, data=request.body, headers=headers) as response:
+            response.raise_for_status()
+            body = await response.text()
+        
+        match = GTTS_AUDIO_RE.search(body)
+        if not match:
+            raise gTTSError(f"No audio in the Google TTS response for '{text}'")
+        audio_parts.append(base64.b64decode(match.group(1)))
+    
+    return b"".join(audio_parts)
+
+def prune_tts_cache():
+    """Remove the least recently used cache files beyond TTS_CACHE_MAX_FILES"""
+    cache_files = [entry for entry in os.scandir(TTS_CACHE_DIR) if entry.name.endswith(".mp3")]
+    if len(cache_files) <= TTS_CACHE_MAX_FILES:
+        return
+    
+    # Another session may be pruning at the same time, so missing files are ignored
+    aged_files = []
+    for entry in cache_files:
+        try:
+            aged_files.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            pass
+    aged_files.sort()
+    for _, path in aged_files[:len(aged_files) - TTS_CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 # File uploader
 uploaded_file = st.file_uploader("Upload your transcript file", type=["txt"])
@@ -231,24 +633,30 @@ if st.button("Generate Podcast Audio"):
     if uploaded_file is not None:
         transcript_text = uploaded_file.getvalue().decode("utf-8")
     
+    # Drop the previous podcast so a failed run doesn't keep showing it
+    st.session_state.pop("podcast_audio", None)
+    
     if transcript_text:
         with st.spinner("Generating podcast audio..."):
             try:
                 audio_bytes = transcript_to_podcast(transcript_text)
                 
                 if audio_bytes:
-                    st.audio(audio_bytes, format="audio/mp3")
-                    
-                    # Create download button
-                    b64 = base64.b64encode(audio_bytes).decode()
-                    href = f'<a href="data:audio/mp3;base64,{b64}" download="podcast.mp3">Download MP3 File</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    st.session_state["podcast_audio"] = audio_bytes
             except Exception as e:
                 st.error(f"Error generating audio: {str(e)}")
                 st.info("Try adjusting your transcript format to match the example.")
     else:
         st.error("Please upload a transcript file or paste transcript text.")
 
+# The podcast is kept in the session so the player and download button survive the
+# rerun that clicking the download button triggers
+if "podcast_audio" in st.session_state:
+    st.audio(st.session_state["podcast_audio"], format="audio/mp3")
+    
+    # Create download button
+    st.download_button("Download MP3 File", data=st.session_state["podcast_audio"], file_name="podcast.mp3", mime="audio/mp3")
+
 # Information section
 with st.expander("How to Format Your Transcript"):
     st.markdown("""